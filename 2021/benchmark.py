@@ -0,0 +1,405 @@
+import argparse
+import importlib
+import json
+import math
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+# solutions live next to this file, and their module names start with digits,
+# so they have to be loaded with importlib rather than a plain import
+sys.path.insert(0, str(Path(__file__).parent))
+
+binary_diagnostic = importlib.import_module('03_binary_diagnostic')
+giant_squid = importlib.import_module('04_giant_squid')
+lanternfish = importlib.import_module('06_lanternfish')
+
+DEFAULT_BASELINE_PATH = Path(__file__).parent / 'benchmark_baseline.json'
+
+
+@dataclass
+class Benchmark:
+    """
+    A set of implementations that solve the same problem.
+
+    The reference implementation is the simplest correct solution, and every
+    other implementation must produce the same answer for the same input.
+    """
+
+    "Name of the benchmark, used as the key in the baseline file"
+    name: str
+    "Build a fresh input, called before every run since some solutions mutate their input"
+    setup: Callable[[], Any]
+    "Implementations by name, each taking the output of setup and returning an answer"
+    implementations: Dict[str, Callable[[Any], Any]] = field(default_factory=dict)
+    "Name of the implementation every other answer is checked against"
+    reference: str = 'reference'
+
+
+@dataclass
+class Measurement:
+    """
+    Timing distribution and peak memory of a single implementation.
+    """
+
+    "Median run time in seconds, after trimming outliers"
+    median: float
+    "Mean run time in seconds, after trimming outliers"
+    mean: float
+    "Standard deviation of run time in seconds, after trimming outliers"
+    stdev: float
+    "Fastest run time in seconds"
+    min: float
+    "Slowest run time in seconds, after trimming outliers"
+    max: float
+    "Peak memory allocated during a single run, in bytes"
+    peak_memory: int
+    "Number of runs averaged into each sample"
+    number: int
+    "Median of this implementation's time over the reference's, sample by sample within one run"
+    ratio: float
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def register(benchmark: Benchmark) -> Benchmark:
+    BENCHMARKS[benchmark.name] = benchmark
+    return benchmark
+
+
+# ---------------------------------------------------------------------------
+# Day 3
+# ---------------------------------------------------------------------------
+
+def reference_binary_diagnostic(report: List[int], num_binary_digits: int) -> binary_diagnostic.DiagnosticResult:
+    """
+    Straightforward solution that counts every column from scratch,
+    and builds the rates up one bit at a time.
+    """
+
+    def bit(number: int, index: int) -> int:
+        return (number >> (num_binary_digits - 1 - index)) & 1
+
+    def most_common(readings: List[int], index: int) -> int:
+        ones = sum(bit(reading, index) for reading in readings)
+        return 1 if ones >= len(readings) - ones else 0
+
+    def rating(readings: List[int], keep_most_common: bool) -> int:
+        for index in range(num_binary_digits):
+            if len(readings) == 1:
+                break
+            wanted = most_common(readings, index)
+            if not keep_most_common:
+                wanted = 1 - wanted
+            readings = [reading for reading in readings if bit(reading, index) == wanted]
+        return readings[0]
+
+    gamma = 0
+    for index in range(num_binary_digits):
+        gamma = (gamma << 1) | most_common(report, index)
+    epsilon = gamma ^ (2 ** num_binary_digits - 1)
+
+    return binary_diagnostic.DiagnosticResult(
+        power_consumption=gamma * epsilon,
+        life_support_rating=rating(report, True) * rating(report, False))
+
+
+def binary_diagnostic_input() -> Dict[str, Any]:
+    rng = random.Random(3)
+    return {
+        'report': [rng.getrandbits(12) for _ in range(2000)],
+        'num_binary_digits': 12,
+    }
+
+
+register(Benchmark(
+    name='03_binary_diagnostic',
+    setup=binary_diagnostic_input,
+    implementations={
+        'reference': lambda input: reference_binary_diagnostic(**input),
+        'binary_diagnostic': lambda input: binary_diagnostic.binary_diagnostic(**input),
+    },
+))
+
+
+# ---------------------------------------------------------------------------
+# Day 4
+# ---------------------------------------------------------------------------
+
+def reference_score_for_winning_board(random_numbers: List[int], boards: List[List[List[int]]], place: int) -> int:
+    """
+    Straightforward solution that rescans every row and column
+    of every board after each drawn number.
+    """
+    marked = set()
+    winners = set()
+    for drawn_number in random_numbers:
+        marked.add(drawn_number)
+        for i, board in enumerate(boards):
+            if i in winners:
+                continue
+            lines = board + [list(col) for col in zip(*board)]
+            if any(all(n in marked for n in line) for line in lines):
+                winners.add(i)
+                if len(winners) == place:
+                    unmarked = [n for row in board for n in row if n not in marked]
+                    return sum(unmarked) * drawn_number
+    raise RuntimeError('No bingo!')
+
+
+def giant_squid_input() -> Dict[str, Any]:
+    rng = random.Random(4)
+    boards = [rng.sample(range(100), 25) for _ in range(100)]
+    return {
+        'random_numbers': rng.sample(range(100), 100),
+        'boards': [[board[i:i+5] for i in range(0, 25, 5)] for board in boards],
+    }
+
+
+register(Benchmark(
+    name='04_giant_squid',
+    setup=giant_squid_input,
+    implementations={
+        'reference': lambda input: reference_score_for_winning_board(
+            input['random_numbers'], input['boards'], place=len(input['boards'])),
+        'get_score_for_winning_board': lambda input: giant_squid.get_score_for_winning_board(
+            input['random_numbers'],
+            [giant_squid.Board(board) for board in input['boards']],
+            place=len(input['boards'])),
+    },
+))
+
+
+# ---------------------------------------------------------------------------
+# Day 6
+# ---------------------------------------------------------------------------
+
+def lanternfish_input() -> lanternfish.SimulationConfiguration:
+    rng = random.Random(6)
+    return lanternfish.SimulationConfiguration(
+        starting_population=[lanternfish.Lanternfish(rng.randint(1, 5)) for _ in range(100)])
+
+
+LANTERNFISH_DAYS = [18, 48]
+
+register(Benchmark(
+    name='06_lanternfish',
+    setup=lanternfish_input,
+    implementations={
+        'reference': lambda conf: lanternfish.get_lanternfish_counts(
+            lanternfish.NaiveSimulation(conf), days=LANTERNFISH_DAYS),
+        'OptimizedSimulation': lambda conf: lanternfish.get_lanternfish_counts(
+            lanternfish.OptimizedSimulation(conf), days=LANTERNFISH_DAYS),
+    },
+))
+
+
+# ---------------------------------------------------------------------------
+# Harness
+# ---------------------------------------------------------------------------
+
+def trim_outliers(samples: List[float], trim: float) -> List[float]:
+    """
+    Drop the slowest `trim` fraction of samples.
+
+    Only the slow end is trimmed: run time is bounded from below by the
+    actual work, and outliers come from scheduling noise, GC pauses and the like.
+
+        trim_outliers([1, 2, 3, 4, 100], 0.2) == [1, 2, 3, 4]
+    """
+    samples = sorted(samples)
+    keep = max(1, len(samples) - int(len(samples) * trim))
+    return samples[:keep]
+
+
+def calibrate(benchmark: Benchmark, implementation: Callable[[Any], Any], min_sample_time: float) -> int:
+    """
+    Return how many runs each sample needs to take at least min_sample_time,
+    so that fast implementations aren't dominated by timer resolution.
+    """
+    input = benchmark.setup()
+    start = time.perf_counter()
+    implementation(input)
+    elapsed = time.perf_counter() - start
+    return max(1, math.ceil(min_sample_time / max(elapsed, 1e-9)))
+
+
+def peak_memory(benchmark: Benchmark, implementation: Callable[[Any], Any]) -> int:
+    """
+    Return the peak memory allocated during a single run, in bytes.
+
+    Tracing allocations slows everything down,
+    so this is done in a separate, untimed run.
+    """
+    input = benchmark.setup()
+    tracemalloc.start()
+    try:
+        implementation(input)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def measure(benchmark: Benchmark, repeat: int, warmup: int, trim: float,
+            min_sample_time: float) -> Dict[str, Measurement]:
+    """
+    Measure every implementation of a benchmark.
+
+    Samples of the implementations are taken in turn, rather than one
+    implementation after the other, so that anything slowing the whole
+    machine down during the run affects all of them alike and cancels
+    out of their ratio to the reference.
+    """
+    implementations = benchmark.implementations
+    for implementation in implementations.values():
+        for _ in range(warmup):
+            implementation(benchmark.setup())
+
+    numbers = {name: calibrate(benchmark, implementation, min_sample_time)
+               for name, implementation in implementations.items()}
+
+    samples: Dict[str, List[float]] = {name: [] for name in implementations}
+    for _ in range(repeat):
+        for name, implementation in implementations.items():
+            # inputs may be mutated, so each run gets its own,
+            # built before the clock starts
+            inputs = [benchmark.setup() for _ in range(numbers[name])]
+            start = time.perf_counter()
+            for input in inputs:
+                implementation(input)
+            samples[name].append((time.perf_counter() - start) / numbers[name])
+
+    reference_samples = samples[benchmark.reference]
+    measurements = {}
+    for name, implementation in implementations.items():
+        ratio = statistics.median(
+            sample / reference for sample, reference in zip(samples[name], reference_samples))
+        trimmed = trim_outliers(samples[name], trim)
+        measurements[name] = Measurement(
+            median=statistics.median(trimmed),
+            mean=statistics.mean(trimmed),
+            stdev=statistics.stdev(trimmed) if len(trimmed) > 1 else 0.0,
+            min=trimmed[0],
+            max=trimmed[-1],
+            peak_memory=peak_memory(benchmark, implementation),
+            number=numbers[name],
+            ratio=ratio,
+        )
+    return measurements
+
+
+def cross_check(benchmark: Benchmark) -> List[str]:
+    """
+    Run every implementation once, and return a description
+    of each one whose answer differs from the reference.
+    """
+    expected = benchmark.implementations[benchmark.reference](benchmark.setup())
+    mismatches = []
+    for name, implementation in benchmark.implementations.items():
+        actual = implementation(benchmark.setup())
+        if actual != expected:
+            mismatches.append(f'{benchmark.name}/{name}: expected {expected}, got {actual}')
+    return mismatches
+
+
+def compare(name: str, current: Measurement, baseline: Dict[str, Any],
+            time_threshold: float, memory_threshold: float) -> List[str]:
+    """
+    Return a description of each way current regressed against baseline.
+    Thresholds are relative, e.g. 0.25 allows a 25% slowdown.
+
+    Time is compared as the ratio to the reference implementation measured
+    in the same run, since absolute times drift between runs and machines.
+    """
+    regressions = []
+    if current.ratio > baseline['ratio'] * (1 + time_threshold):
+        regressions.append(
+            f'{name}: {current.ratio:.4f}x reference time vs baseline {baseline["ratio"]:.4f}x')
+    if current.peak_memory > baseline['peak_memory'] * (1 + memory_threshold):
+        regressions.append(
+            f'{name}: peak memory {current.peak_memory}B vs baseline {baseline["peak_memory"]}B')
+    return regressions
+
+
+def run(names: List[str], repeat: int, warmup: int, trim: float, min_sample_time: float,
+        time_threshold: float, memory_threshold: float,
+        baseline_path: Path, save: bool) -> int:
+    baseline: Dict[str, Any] = {}
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text())
+
+    failures: List[str] = []
+    if not save and not baseline:
+        failures.append(f'no baseline at {baseline_path}, run with --save to record one')
+
+    results: Dict[str, Dict[str, Any]] = {}
+
+    for name in names:
+        benchmark = BENCHMARKS[name]
+        failures.extend(cross_check(benchmark))
+
+        measurements = measure(benchmark, repeat, warmup, trim, min_sample_time)
+        for impl_name, measurement in measurements.items():
+            key = f'{name}/{impl_name}'
+            results[key] = asdict(measurement)
+            print(f'{key:<50} median {measurement.median * 1000:9.3f}ms '
+                  f'± {measurement.stdev * 1000:7.3f}ms  x{measurement.number:<5} '
+                  f'{measurement.ratio:8.4f}x ref  peak {measurement.peak_memory:>10}B')
+
+            if save:
+                continue
+            if key in baseline:
+                failures.extend(compare(key, measurement, baseline[key], time_threshold, memory_threshold))
+            elif baseline:
+                failures.append(f'{key}: not in baseline, run with --save to record it')
+
+    if save:
+        baseline.update(results)
+        baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+        print(f'Saved baseline to {baseline_path}')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark solutions against their reference implementations.')
+    parser.add_argument('names', nargs='*', metavar='name',
+                        help=f'benchmarks to run, defaults to all of: {", ".join(BENCHMARKS)}')
+    parser.add_argument('--repeat', type=int, default=20, help='timed runs per implementation')
+    parser.add_argument('--warmup', type=int, default=3, help='untimed runs before timing')
+    parser.add_argument('--trim', type=float, default=0.1, help='fraction of slowest runs to discard')
+    parser.add_argument('--min-sample-time', type=float, default=0.01,
+                        help='seconds each sample runs for, fast implementations are repeated to fill it')
+    parser.add_argument('--time-threshold', type=float, default=0.25,
+                        help='allowed relative increase in median time, relative to the reference')
+    parser.add_argument('--memory-threshold', type=float, default=0.25,
+                        help='allowed relative increase in peak memory')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE_PATH)
+    parser.add_argument('--save', action='store_true', help='record results as the new baseline')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f'unknown benchmark(s): {", ".join(unknown)}')
+
+    sys.exit(run(
+        names=args.names or list(BENCHMARKS),
+        repeat=args.repeat,
+        warmup=args.warmup,
+        trim=args.trim,
+        min_sample_time=args.min_sample_time,
+        time_threshold=args.time_threshold,
+        memory_threshold=args.memory_threshold,
+        baseline_path=args.baseline,
+        save=args.save,
+    ))
@@ -0,0 +1,42 @@
+"""
+Stand-in for nog, for exercising util.py offline.
+
+Point util.py at it with the AOC_FETCH_COMMAND environment variable:
+
+    AOC_FETCH_COMMAND="python stub_fetcher.py --sleep 0.5 --fail-days 3" python util.py 1 2 3 4
+"""
+
+import argparse
+import random
+import subprocess
+import sys
+import time
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stub puzzle input fetcher.')
+    parser.add_argument('-d', '--day', type=int, required=True)
+    parser.add_argument('-y', '--year', type=int, required=True)
+    parser.add_argument('--sleep', type=float, default=0.0,
+                        help='seconds to wait before responding, to simulate network latency')
+    parser.add_argument('--lines', type=int, default=10, help='number of input lines to print')
+    parser.add_argument('--exit-code', type=int, default=1, help='exit code used when failing')
+    parser.add_argument('--fail-days', type=int, nargs='*', default=[], help='days that always fail')
+    parser.add_argument('--flaky', type=float, default=0.0,
+                        help='probability that any single attempt fails, to exercise retries')
+    parser.add_argument('--spawn', type=float, default=0.0,
+                        help='start a background child that sleeps this long, to exercise cleanup')
+    args = parser.parse_args()
+
+    if args.spawn:
+        # inherits our stdout, so it holds the pipe open like a real stray child would
+        subprocess.Popen(['sleep', f'{args.spawn}'])
+
+    time.sleep(args.sleep)
+
+    if args.day in args.fail_days or random.random() < args.flaky:
+        print(f'stub: failed to fetch {args.year} day {args.day}', file=sys.stderr)
+        sys.exit(args.exit_code)
+
+    for line in range(args.lines):
+        print(f'{args.year} {args.day} {line}')
@@ -1,11 +1,209 @@
-import subprocess
-from typing import List
+import argparse
+import asyncio
+import contextlib
+import os
+import shlex
+import signal
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# https://github.com/breakthatbass/eggnog
+DEFAULT_FETCH_COMMAND = ['nog']
+# directory where fetched inputs are cached, one file per (year, day)
+CACHE_DIR = Path(__file__).parent / '.inputs'
+
+
+class FetchError(RuntimeError):
+    """
+    Raised when an input could not be fetched, after all retries.
+    """
+
+
+@dataclass
+class PrefetchResult:
+    "Fetched inputs, by (year, day)"
+    inputs: Dict[Tuple[int, int], List[str]] = field(default_factory=dict)
+    "Errors for the inputs that could not be fetched, by (year, day)"
+    failures: Dict[Tuple[int, int], FetchError] = field(default_factory=dict)
+
+
+def fetch_command() -> List[str]:
+    """
+    Return the command used to fetch inputs.
+
+    Defaults to nog, but can be overridden with the AOC_FETCH_COMMAND
+    environment variable (e.g. a stub script when working offline).
+    The command is invoked with `-d <day> -y <year>` appended.
+    """
+    override = os.environ.get('AOC_FETCH_COMMAND')
+    return shlex.split(override) if override else DEFAULT_FETCH_COMMAND
+
+
+def cache_path(year: int, day: int, cache_dir: Path = CACHE_DIR) -> Path:
+    return cache_dir / f'{year}_{day:02}.txt'
+
+
+def read_cache(year: int, day: int, cache_dir: Path = CACHE_DIR) -> Optional[List[str]]:
+    path = cache_path(year, day, cache_dir)
+    if not path.exists():
+        return None
+    return path.read_text(encoding='utf-8').splitlines()
+
+
+def write_cache(year: int, day: int, lines: List[str], cache_dir: Path = CACHE_DIR) -> None:
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_path(year, day, cache_dir)
+    # write to a temporary file first, so a concurrent reader
+    # never sees a partially written input
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    tmp_path.replace(path)
+
+
+async def fetch_input(
+        year: int,
+        day: int,
+        command: Optional[List[str]] = None,
+        timeout: float = 30.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        cache_dir: Path = CACHE_DIR) -> List[str]:
+    """
+    Fetch the input for a single day, writing it through to the cache.
+
+    Parameters
+    ----------
+    year: int
+        puzzle year
+    day: int
+        puzzle day
+    command: Optional[List[str]]
+        fetcher command, defaults to fetch_command()
+    timeout: float
+        seconds to wait for a single attempt before killing it
+    retries: int
+        number of attempts made after the first one fails
+    backoff: float
+        delay before the first retry, doubled after every failed attempt
+    cache_dir: Path
+        directory inputs are cached in
+    """
+    cached = read_cache(year, day, cache_dir)
+    if cached is not None:
+        return cached
+
+    args = (command or fetch_command()) + ['-d', f'{day}', '-y', f'{year}']
+    delay = backoff
+    error = ''
+
+    for attempt in range(retries + 1):
+        if attempt:
+            await asyncio.sleep(delay)
+            delay *= 2
+
+        try:
+            # run in its own session, so that we can kill anything the fetcher
+            # started too (e.g. a stub wrapper script's children), which would
+            # otherwise hold the output pipes open or outlive us
+            process = await asyncio.create_subprocess_exec(
+                *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True)
+        except OSError as e:
+            # command is missing or not executable, retrying won't help
+            raise FetchError(f'Could not run {args[0]!r}: {e}') from e
+
+        finished = False
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            finished = True
+        except asyncio.TimeoutError:
+            error = f'timed out after {timeout}s'
+            continue
+        finally:
+            # whether the attempt finished, timed out or was cancelled,
+            # nothing from the fetcher's session should be left running
+            with contextlib.suppress(ProcessLookupError):
+                os.killpg(process.pid, signal.SIGKILL)
+            if not finished:
+                # drain the pipes too, so their transports are closed before the loop is
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(process.communicate(), timeout)
+
+        if process.returncode != 0 or not stdout.strip():
+            error = stderr.decode('utf-8', errors='replace').strip() or f'exit code {process.returncode}'
+            continue
+
+        try:
+            lines = stdout.decode('utf-8').splitlines()
+        except UnicodeDecodeError as e:
+            error = f'output is not valid UTF-8: {e}'
+            continue
+
+        write_cache(year, day, lines, cache_dir)
+        return lines
+
+    raise FetchError(f'Failed to fetch input for {year} day {day}: {error}')
+
+
+async def prefetch_inputs(
+        puzzles: Iterable[Tuple[int, int]],
+        concurrency: int = 4,
+        **kwargs) -> PrefetchResult:
+    """
+    Fetch the inputs for several (year, day) pairs concurrently,
+    running at most `concurrency` fetcher processes at a time.
+
+    An input that can't be fetched doesn't stop the others,
+    it is reported in the result's failures instead.
+
+    Extra keyword arguments are passed through to fetch_input.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    puzzles = list(dict.fromkeys(puzzles))
+
+    async def fetch(year: int, day: int) -> List[str]:
+        async with semaphore:
+            return await fetch_input(year, day, **kwargs)
+
+    results = await asyncio.gather(*[fetch(year, day) for year, day in puzzles], return_exceptions=True)
+
+    prefetched = PrefetchResult()
+    for puzzle, result in zip(puzzles, results):
+        if isinstance(result, FetchError):
+            prefetched.failures[puzzle] = result
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            prefetched.inputs[puzzle] = result
+    return prefetched
 
 
 def get_input(year: int, day: int) -> List[str]:
-    # https://github.com/breakthatbass/eggnog
-    process = subprocess.Popen(['nog', '-d', f'{day}', '-y', f'{year}'],
-                               stdout=subprocess.PIPE,
-                               stderr=subprocess.PIPE)
-    stdout, _ = process.communicate()
-    return stdout.decode('utf-8').splitlines()
+    return asyncio.run(fetch_input(year, day))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Prefetch puzzle inputs into the local cache.')
+    parser.add_argument('days', type=int, nargs='+')
+    parser.add_argument('-y', '--year', type=int, default=2021)
+    parser.add_argument('-c', '--concurrency', type=int, default=4)
+    parser.add_argument('-t', '--timeout', type=float, default=30.0)
+    parser.add_argument('-r', '--retries', type=int, default=3)
+    args = parser.parse_args()
+
+    result = asyncio.run(prefetch_inputs(
+        [(args.year, day) for day in args.days],
+        concurrency=args.concurrency,
+        timeout=args.timeout,
+        retries=args.retries))
+
+    for (year, day), lines in result.inputs.items():
+        print(f'{year} day {day}: {len(lines)} line(s) -> {cache_path(year, day)}')
+    for (year, day), error in result.failures.items():
+        print(f'{year} day {day}: {error}', file=sys.stderr)
+
+    sys.exit(1 if result.failures else 0)